@@ -22,11 +22,12 @@ test_settings = dict(
     GOOGLE_ANALYTICS_ID='UA-12345678-0',
 )
 
+if not settings.configured:
+    settings.configure(**test_settings)
+    django.setup()
+
 
 def run():
-    if not settings.configured:
-        settings.configure(**test_settings)
-        django.setup()
     failures = DiscoverRunner(verbosity=2, failfast=False, interactive=False).run_tests(['tests'])
     sys.exit(failures)
 
@@ -10,49 +10,61 @@ try:
     from django.urls import reverse
 except ImportError:
     from django.core.urlresolvers import reverse
-from django.http import QueryDict
-from django.test import SimpleTestCase
+from django.test import Client, SimpleTestCase
 import responses
-from six.moves.urllib.parse import urljoin
+from six.moves.urllib.parse import parse_qsl, urljoin
+
+from tests import test_settings
+from tests.forms import ManyErrorTestForm, RequestReportedForm, SimpleReportedForm
+
+common_hit_params = {
+    'v': '1',
+    'tid': test_settings['GOOGLE_ANALYTICS_ID'],
+    't': 'event',
+}
 
 
 class FormErrorReportingTestCase(SimpleTestCase):
-    def submit_simple_form(self, data):
-        from tests.forms import SimpleReportedForm
+    @classmethod
+    def setUpClass(cls):
+        super(FormErrorReportingTestCase, cls).setUpClass()
+        cls._rsps = responses.RequestsMock(assert_all_requests_are_fired=False)
+        cls._rsps.start()
+        cls._client = Client()
+        cls._test_form_url = reverse('test-form')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._rsps.stop()
+        cls._rsps.reset()
+        super(FormErrorReportingTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        self._rsps.reset()
+        self._client.cookies.clear()  # the client is shared, so drop any session from previous tests
 
+    def submit_simple_form(self, data):
         form = SimpleReportedForm(data=data)
         form.ga_client_id = form.get_ga_client_id()  # freeze a generated client id
         return form
 
-    def assertResponseErrorsReported(self, rsps, expected_error_dicts):  # noqa
-        for expected_error_dict in expected_error_dicts:
-            expected_error_dict.update({
-                'v': '1',
-                'tid': 'UA-12345678-0',
-                't': 'event',
-            })
-        reported_error_dicts = []
+    def assertResponseErrorsReported(self, rsps, url, expected_error_dicts):  # noqa
+        expected_error_dicts = [dict(common_hit_params, **expected_error_dict)
+                                for expected_error_dict in expected_error_dicts]
         self.assertEqual(len(rsps.calls), 1)
-        for error_line in rsps.calls[0].request.body.splitlines():
-            if not error_line:
-                continue
-            error_params = QueryDict(error_line)
-            error_params = {k: v for k, v in error_params.items()}
-            reported_error_dicts.append(error_params)
-        self.assertEqual(len(reported_error_dicts), len(expected_error_dicts))
-        error_dict_pairs = zip(reported_error_dicts, expected_error_dicts)
-        for reported_error_dict, expected_error_dict in error_dict_pairs:
-            self.assertDictEqual(reported_error_dict, expected_error_dict)
+        self.assertEqual(rsps.calls[0].request.url, url)
+        body = rsps.calls[0].request.body
+        reported_error_dicts = [dict(parse_qsl(error_line, keep_blank_values=True))
+                                for error_line in body.split('\n') if error_line]
+        self.assertEqual(reported_error_dicts, expected_error_dicts)
 
     def assertFormErrorsReported(self, form, expected_error_dicts):  # noqa
-        with responses.RequestsMock() as rsps:
-            rsps.add(rsps.POST, form.get_ga_batch_endpoint())
-            self.assertFalse(form.is_valid(), 'Form should be invalid')
-            self.assertResponseErrorsReported(rsps, expected_error_dicts)
+        url = form.get_ga_batch_endpoint()
+        self._rsps.add(responses.POST, url)
+        self.assertFalse(form.is_valid(), 'Form should be invalid')
+        self.assertResponseErrorsReported(self._rsps, url, expected_error_dicts)
 
     def test_no_errors_send_no_reports(self):
-        from tests.forms import SimpleReportedForm
-
         form = SimpleReportedForm(data={
             'required_number': 4,
             'required_text': 'abc',
@@ -118,8 +130,6 @@ class FormErrorReportingTestCase(SimpleTestCase):
         ])
 
     def test_report_batching(self):
-        from tests.forms import ManyErrorTestForm
-
         form = ManyErrorTestForm(data={'required_text': 'abc'})
         with mock.patch('form_error_reporting.requests') as mocked_requests:
             self.assertFalse(form.is_valid(), 'Form should be invalid')
@@ -132,42 +142,38 @@ class FormErrorReportingTestCase(SimpleTestCase):
                                      'There cannot be more than 20 hits per report')
 
     def test_form_errors_with_session(self):
-        from tests.forms import RequestReportedForm
-
         user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_2) AppleWebKit/537.36 (KHTML, like Gecko) ' \
                      'Chrome/55.0.2883.95 Safari/537.36'
-        with responses.RequestsMock() as rsps:
-            rsps.add(rsps.POST, urljoin(RequestReportedForm.ga_endpoint_base, '/batch'))
-            response = self.client.post(reverse('test-form'), data={
-                'required_number': 1,
-                'required_text': '',
-            }, HTTP_USER_AGENT=user_agent)
-            client_id = response.client.session.get('ga_client_id')
-            self.assertContains(response, '"False"')
-            self.assertResponseErrorsReported(rsps, [
-                {
-                    'cid': client_id,
-                    'ec': 'tests.forms.RequestReportedForm',
-                    'ea': 'required_number',
-                    'el': 'Ensure this value is greater than or equal to 3.',
-                    'uip': '127.0.0.1',
-                    'ua': user_agent,
-                },
-                {
-                    'cid': client_id,
-                    'ec': 'tests.forms.RequestReportedForm',
-                    'ea': 'required_text',
-                    'el': 'This field is required.',
-                    'uip': '127.0.0.1',
-                    'ua': user_agent,
-                },
-            ])
+        url = urljoin(RequestReportedForm.ga_endpoint_base, '/batch')
+        self._rsps.add(responses.POST, url)
+        response = self._client.post(self._test_form_url, data={
+            'required_number': 1,
+            'required_text': '',
+        }, HTTP_USER_AGENT=user_agent)
+        client_id = self._client.session.get('ga_client_id')
+        self.assertContains(response, '"False"')
+        self.assertResponseErrorsReported(self._rsps, url, [
+            {
+                'cid': client_id,
+                'ec': 'tests.forms.RequestReportedForm',
+                'ea': 'required_number',
+                'el': 'Ensure this value is greater than or equal to 3.',
+                'uip': '127.0.0.1',
+                'ua': user_agent,
+            },
+            {
+                'cid': client_id,
+                'ec': 'tests.forms.RequestReportedForm',
+                'ea': 'required_text',
+                'el': 'This field is required.',
+                'uip': '127.0.0.1',
+                'ua': user_agent,
+            },
+        ])
 
     @unittest.skipIf('GOOGLE_ANALYTICS_ID' not in os.environ,
                      'Provide a valid GOOGLE_ANALYTICS_ID environment variable')
     def test_validate_reporting_format(self):
-        from tests.forms import SimpleReportedForm
-
         report_errors_to_ga = SimpleReportedForm.report_errors_to_ga
 
         def report_errors(self_, errors):
@@ -195,4 +201,5 @@ class FormErrorReportingTestCase(SimpleTestCase):
         form.ga_endpoint_base = 'https://ssl.google-analytics.com/debug/'
         form.ga_batch_hits = False
         form.report_errors_to_ga = types.MethodType(report_errors, form)
+        self._rsps.add_passthru(form.ga_endpoint_base)
         form.is_valid()